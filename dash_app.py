@@ -1,78 +1,326 @@
 
+import os
+import hashlib
+import tempfile
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pathlib import Path
+from functools import lru_cache
 from datetime import datetime
-from dash import Dash, dcc, html
+from dash import Dash, dcc, html, Input, Output, State
+from flask import Response, abort
 import plotly.express as px
 import plotly.graph_objects as go
 
-df = pd.read_csv("servicenow_incidents.csv", parse_dates=["opened_at","resolved_at"])
+try:
+    from numba import njit  # optional: compiles the per-row group kernel below
+except ImportError:
+    njit = None
 
-app = Dash(__name__)
+try:
+    from flask_caching import Cache  # optional: share the loaded data and figure JSON across workers
+except ImportError:
+    Cache = None
+
+try:
+    import flask_compress  # optional: gzip the figure JSON and Dash assets
+except ImportError:
+    flask_compress = None
+
+CATEGORY_COLS = ["priority","state","category","assignment_group","configuration_item"]
+STATES = ["New","In Progress","On Hold","Resolved","Closed","Cancelled"]
+WEEKDAYS = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"]
+
+def read_incidents_csv(path):
+    return pd.read_csv(path, parse_dates=["opened_at","resolved_at"],
+                       dtype={c: "category" for c in CATEGORY_COLS})
+
+def load_incidents(path):
+    # Parse the CSV once and cache it as Parquet next to it; rebuild when the CSV is newer.
+    # Any failure to write or read the cache falls back to the CSV, so the cache can't stop the app.
+    path = Path(path)
+    pq = path.with_suffix(".parquet")
+    if not pq.exists() or pq.stat().st_mtime < path.stat().st_mtime:
+        raw = read_incidents_csv(path)
+        # Write to a temp file and rename it over the cache, so a concurrent reader never sees a
+        # half-written file. mkstemp creates it 0600; widen to the umask default so other accounts
+        # running the app can read it.
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(dir=pq.parent, prefix=pq.name + ".", suffix=".tmp")
+            os.close(fd)
+            raw.to_parquet(tmp, compression="zstd")
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp, 0o666 & ~umask)
+            os.replace(tmp, pq)
+        except OSError:
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+            return raw
+    try:
+        return pd.read_parquet(pq)
+    except (OSError, pa.ArrowInvalid):
+        return read_incidents_csv(path)
+
+app = Dash(__name__, compress=flask_compress is not None)
 app.title = "ServiceNow Ops Dashboard"
 
-df["opened_date"] = df["opened_at"].dt.date
-df["opened_week"] = df["opened_at"].dt.to_period("W").astype(str)
-df["opened_hour"] = df["opened_at"].dt.hour
-df["opened_wday"] = df["opened_at"].dt.day_name()
+CSV_PATH = Path("servicenow_incidents.csv").resolve()
+# Shared cache entries and figure URLs are keyed on this, so editing the CSV or this file, or running
+# a second checkout against the same cache, never picks up another version's entries.
+DATA_VERSION = hashlib.sha1(
+    f"{CSV_PATH}|{CSV_PATH.stat().st_mtime}|{Path(__file__).stat().st_mtime}".encode()
+).hexdigest()[:16]
+
+def private_cache_dir():
+    # The cache holds pickles, so it must live in a directory only this user can write:
+    # $SN_CACHE_DIR, else $XDG_CACHE_HOME/sn_dashboard (default ~/.cache/sn_dashboard).
+    # Returns None (cache disabled) if that can't be ensured.
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    path = os.environ.get("SN_CACHE_DIR") or os.path.join(base, "sn_dashboard")
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.stat(path)
+    except OSError:
+        return None
+    if hasattr(os, "getuid") and (st.st_uid != os.getuid() or st.st_mode & 0o022):
+        return None
+    return path
+
+cache_dir = private_cache_dir() if Cache is not None else None
+if cache_dir is not None:
+    cache = Cache(app.server, config={
+        "CACHE_TYPE": "FileSystemCache",
+        "CACHE_DIR": cache_dir,
+        "CACHE_DEFAULT_TIMEOUT": 3600,
+        "CACHE_OPTIONS": {"mode": 0o600},
+    })
+
+    @cache.memoize()
+    def cached_incidents(path, version):
+        return load_incidents(path)
+
+    df = cached_incidents(str(CSV_PATH), DATA_VERSION)
+else:
+    cache = None
+    df = load_incidents(CSV_PATH)
 
-g1 = df["priority"].value_counts().reset_index().rename(columns={"index":"priority","priority":"count"})
-fig1 = px.bar(g1, x="priority", y="count", title="Incidents by Priority")
+# Derive the calendar columns from the raw int64 nanoseconds in one go; names are attached at plot time.
+NS_PER_HOUR = 3_600_000_000_000
+NS_PER_DAY = 24 * NS_PER_HOUR
+# NaT views as INT64_MIN, so missing timestamps get -1 (week: <NA>) and are left out of the charts.
+opened_at = df["opened_at"].to_numpy("datetime64[ns]")
+opened_valid = ~np.isnat(opened_at)
+opened_ns = opened_at.view("i8")
+opened_days = opened_ns // NS_PER_DAY
+df["opened_date"] = opened_at.astype("datetime64[D]")
+df["opened_week"] = pd.arrays.IntegerArray((opened_days + 3) // 7, ~opened_valid)  # Monday-based weeks since 1969-12-29
+df["opened_hour"] = np.where(opened_valid, (opened_ns // NS_PER_HOUR) % 24, -1).astype("int8")
+df["opened_wday"] = np.where(opened_valid, (opened_days + 3) % 7, -1).astype("int8")  # 1970-01-01 was a Thursday; Monday == 0
 
-g2 = df.groupby("opened_date").size().reset_index(name="count")
-fig2 = px.line(g2, x="opened_date", y="count", title="Incidents Opened per Day")
+def top_k(values, k):
+    # Indices of the k largest values, largest first; partition is O(n), only the k winners get sorted.
+    k = min(k, len(values))
+    if not k:
+        return np.arange(0)
+    top = np.argpartition(values, -k)[-k:]
+    return top[np.argsort(-values[top], kind="stable")]
 
-g3 = df.dropna(subset=["time_to_resolve_minutes"]).groupby("priority")["time_to_resolve_minutes"].mean().reset_index()
-fig3 = px.bar(g3, x="priority", y="time_to_resolve_minutes", title="Mean TTR by Priority")
+# Per-group sum of values and row count over integer group codes; code -1 (missing key) is skipped.
+if njit is not None:
+    # Single pass over codes/values, no masked copies. Serial on purpose: a prange over rows would
+    # race on sums[c]/cnts[c]. cache=True keeps the compiled kernel on disk across restarts.
+    @njit(cache=True)
+    def group_sum_count(codes, values, ngroups):
+        sums = np.zeros(ngroups, np.float64)
+        cnts = np.zeros(ngroups, np.int64)
+        for i in range(codes.shape[0]):
+            c = codes[i]
+            if c >= 0:
+                sums[c] += values[i]
+                cnts[c] += 1
+        return sums, cnts
+else:
+    def group_sum_count(codes, values, ngroups):
+        valid = codes >= 0
+        codes = codes[valid]
+        return (np.bincount(codes, weights=values[valid], minlength=ngroups),
+                np.bincount(codes, minlength=ngroups))
 
-g4 = df.groupby("assignment_group")["sla_breached"].mean().reset_index()
-g4["sla_breach_pct"] = (g4["sla_breached"] * 100).round(2)
-fig4 = px.bar(g4.sort_values("sla_breach_pct", ascending=False).head(10),
-              x="assignment_group", y="sla_breach_pct",
-              title="Top 10 Assignment Groups by SLA Breach %")
+def priority_stats(df):
+    # Incident count and mean TTR per priority, straight from the category codes.
+    priorities = df["priority"].cat.categories
+    codes = df["priority"].cat.codes.to_numpy()
+    ttr = df["time_to_resolve_minutes"].to_numpy(dtype=np.float64)
+    resolved = ~np.isnan(ttr)
+    count = np.bincount(codes[codes >= 0], minlength=len(priorities))
+    ttr_sum, ttr_n = group_sum_count(codes[resolved], ttr[resolved], len(priorities))
+    seen = np.flatnonzero(count)
+    with np.errstate(invalid="ignore"):
+        mean_ttr = ttr_sum[seen] / ttr_n[seen]
+    return pd.DataFrame({"priority": priorities[seen], "count": count[seen], "mean_ttr": mean_ttr})
 
-g5 = df.pivot_table(index="category", columns="state", values="incident_id", aggfunc="count", fill_value=0).reset_index()
-fig5 = px.bar(g5, x="category", y=g5.columns[1:], title="Incident States by Category", barmode="stack")
+def state_by_category(df):
+    # category x state counts from one bincount over the packed code pair; unseen rows/columns dropped.
+    cats = df["category"].cat.categories
+    states = df["state"].cat.categories
+    cat_codes = df["category"].cat.codes.to_numpy().astype(np.int64)
+    state_codes = df["state"].cat.codes.to_numpy().astype(np.int64)
+    valid = (cat_codes >= 0) & (state_codes >= 0)
+    flat = cat_codes[valid] * len(states) + state_codes[valid]
+    counts = np.bincount(flat, minlength=len(cats) * len(states)).reshape(len(cats), len(states))
+    rows = np.flatnonzero(counts.sum(axis=1))
+    cols = np.flatnonzero(counts.sum(axis=0))
+    g = pd.DataFrame(counts[np.ix_(rows, cols)], columns=states[cols].astype(str))
+    g.insert(0, "category", cats[rows])
+    return g
 
-g6 = df.pivot_table(index="opened_wday", columns="opened_hour", values="incident_id", aggfunc="count", fill_value=0)
-g6 = g6.reindex(["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"])
-fig6 = px.imshow(g6, aspect="auto", title="Incidents Opened: Hour vs Weekday")
+def build_priority_fig(df):
+    return px.bar(priority_stats(df), x="priority", y="count", title="Incidents by Priority")
 
-g7 = df.dropna(subset=["time_to_resolve_minutes"])
-fig7 = px.box(g7, x="category", y="time_to_resolve_minutes", title="TTR Distribution by Category")
+def build_daily_fig(df):
+    # np.unique sorts and counts the epoch-day values in C; its output is already in date order.
+    days = df["opened_date"].to_numpy().astype("datetime64[D]")
+    uniq, cnts = np.unique(days[~np.isnat(days)], return_counts=True)
+    g2 = pd.DataFrame({"opened_date": uniq, "count": cnts})
+    return px.line(g2, x="opened_date", y="count", title="Incidents Opened per Day")
 
-g8 = df["configuration_item"].value_counts().head(10).reset_index()
-g8.columns = ["configuration_item","count"]
-g8["cum_pct"] = g8["count"].cumsum() / g8["count"].sum() * 100
-fig8 = go.Figure()
-fig8.add_bar(x=g8["configuration_item"], y=g8["count"], name="Count")
-fig8.add_trace(go.Scatter(x=g8["configuration_item"], y=g8["cum_pct"], yaxis="y2", name="Cumulative %"))
-fig8.update_layout(title="Pareto: Top 10 Configuration Items",
-                   yaxis2=dict(overlaying='y', side='right', range=[0,100], title="Cumulative %"))
+def build_ttr_priority_fig(df):
+    return px.bar(priority_stats(df), x="priority", y="mean_ttr", title="Mean TTR by Priority",
+                  labels={"mean_ttr":"time_to_resolve_minutes"})
 
-g9 = df["state"].value_counts()[["New","In Progress","On Hold","Resolved","Closed","Cancelled"]].fillna(0).reset_index()
-g9.columns = ["state","count"]
-fig9 = px.funnel(g9, x="count", y="state", title="Workflow Funnel by State")
+def build_sla_fig(df):
+    # Breach rate per group from the category codes.
+    groups = df["assignment_group"].cat.categories
+    num, den = group_sum_count(df["assignment_group"].cat.codes.to_numpy(),
+                               df["sla_breached"].to_numpy().astype(np.float32), len(groups))
+    seen = np.flatnonzero(den)
+    pct = num[seen] / den[seen] * 100
+    top = top_k(pct, 10)
+    g4 = pd.DataFrame({"assignment_group": groups[seen[top]], "sla_breach_pct": pct[top].round(2)})
+    return px.bar(g4, x="assignment_group", y="sla_breach_pct",
+                  title="Top 10 Assignment Groups by SLA Breach %")
 
-g10 = df.dropna(subset=["customer_satisfaction"])
-fig10 = px.scatter(g10, x="time_to_first_response_minutes", y="customer_satisfaction",
-                   title="First Response Time vs CSAT", trendline=None)
+def build_state_category_fig(df):
+    g5 = state_by_category(df)
+    return px.bar(g5, x="category", y=g5.columns[1:], title="Incident States by Category", barmode="stack")
+
+def build_heatmap_fig(df):
+    # 7x24 counts from one bincount over the packed (weekday, hour) index; no hashing.
+    wday = df["opened_wday"].to_numpy().astype(np.int32)
+    hour = df["opened_hour"].to_numpy().astype(np.int32)
+    valid = (wday >= 0) & (hour >= 0)
+    flat = wday[valid] * 24 + hour[valid]
+    g6 = np.bincount(flat, minlength=7 * 24).reshape(7, 24)
+    return px.imshow(g6, x=list(range(24)), y=WEEKDAYS, aspect="auto",
+                     labels={"x":"opened_hour", "y":"opened_wday", "color":"count"},
+                     title="Incidents Opened: Hour vs Weekday")
+
+def build_ttr_category_fig(df):
+    g7 = df.dropna(subset=["time_to_resolve_minutes"])
+    return px.box(g7, x="category", y="time_to_resolve_minutes", title="TTR Distribution by Category")
+
+def build_pareto_fig(df):
+    # Counts per CI straight from the category codes; cumulative % is against all incidents, not just the top 10.
+    codes = df["configuration_item"].cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(df["configuration_item"].cat.categories))
+    top = top_k(counts, 10)
+    g8 = pd.DataFrame({"configuration_item": df["configuration_item"].cat.categories[top],
+                       "count": counts[top]})
+    g8["cum_pct"] = g8["count"].cumsum() / counts.sum() * 100
+    fig8 = go.Figure()
+    fig8.add_bar(x=g8["configuration_item"], y=g8["count"], name="Count")
+    fig8.add_trace(go.Scatter(x=g8["configuration_item"], y=g8["cum_pct"], yaxis="y2", name="Cumulative %"))
+    fig8.update_layout(title="Pareto: Top 10 Configuration Items",
+                       yaxis2=dict(overlaying='y', side='right', range=[0,100], title="Cumulative %"))
+    return fig8
+
+def build_funnel_fig(df):
+    # Per-state totals from the state codes alone, so rows with a missing category still count.
+    states = df["state"].cat.categories
+    codes = df["state"].cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(states))
+    g9 = pd.Series(counts, index=states.astype(str)).reindex(STATES, fill_value=0).reset_index()
+    g9.columns = ["state","count"]
+    return px.funnel(g9, x="count", y="state", title="Workflow Funnel by State")
+
+def build_csat_fig(df):
+    g10 = df.dropna(subset=["customer_satisfaction"])
+    # WebGL markers: one GPU draw call instead of an SVG node per incident.
+    return px.scatter(g10, x="time_to_first_response_minutes", y="customer_satisfaction",
+                      title="First Response Time vs CSAT", trendline=None,
+                      render_mode="webgl", opacity=0.3)
+
+TAB_LABELS = {
+    "priority": "Priority Mix",
+    "daily": "Daily Volume",
+    "ttr-priority": "TTR by Priority",
+    "sla": "SLA Breach %",
+    "state-category": "State by Category",
+    "heatmap": "Hourly Heatmap",
+    "ttr-category": "TTR by Category",
+    "pareto": "CI Pareto",
+    "funnel": "State Funnel",
+    "csat": "First Response vs CSAT",
+}
+FIG_BUILDERS = {
+    "priority": build_priority_fig,
+    "daily": build_daily_fig,
+    "ttr-priority": build_ttr_priority_fig,
+    "sla": build_sla_fig,
+    "state-category": build_state_category_fig,
+    "heatmap": build_heatmap_fig,
+    "ttr-category": build_ttr_category_fig,
+    "pareto": build_pareto_fig,
+    "funnel": build_funnel_fig,
+    "csat": build_csat_fig,
+}
+
+@lru_cache(maxsize=None)
+def figure_json(name):
+    # Built and serialized at most once per process, the first time its tab is opened;
+    # with flask_caching, at most once across all workers and reloads for the same data.
+    if cache is None:
+        return FIG_BUILDERS[name](df).to_json()
+    key = f"fig:{name}:{DATA_VERSION}"
+    fig_json = cache.get(key)
+    if fig_json is None:
+        fig_json = FIG_BUILDERS[name](df).to_json()
+        cache.set(key, fig_json)
+    return fig_json
+
+# The data version is part of the URL, so a response can be cached for good: new data means a new URL.
+# A page still holding an older version gets the current figure, uncached.
+@app.server.route(app.config.routes_pathname_prefix + "fig/<version>/<name>")
+def serve_figure(version, name):
+    if name not in FIG_BUILDERS:
+        abort(404)
+    cache_control = "public, max-age=31536000, immutable" if version == DATA_VERSION else "no-cache"
+    return Response(figure_json(name), mimetype="application/json",
+                    headers={"Cache-Control": cache_control})
 
 app.layout = html.Div([
     html.H1("ServiceNow Operational Dashboard"),
     html.P("Synthetic demo dataset. Use this to explore KPI trends and drilldowns."),
-    dcc.Tabs([
-        dcc.Tab(label="Priority Mix", children=[dcc.Graph(figure=fig1)]),
-        dcc.Tab(label="Daily Volume", children=[dcc.Graph(figure=fig2)]),
-        dcc.Tab(label="TTR by Priority", children=[dcc.Graph(figure=fig3)]),
-        dcc.Tab(label="SLA Breach %", children=[dcc.Graph(figure=fig4)]),
-        dcc.Tab(label="State by Category", children=[dcc.Graph(figure=fig5)]),
-        dcc.Tab(label="Hourly Heatmap", children=[dcc.Graph(figure=fig6)]),
-        dcc.Tab(label="TTR by Category", children=[dcc.Graph(figure=fig7)]),
-        dcc.Tab(label="CI Pareto", children=[dcc.Graph(figure=fig8)]),
-        dcc.Tab(label="State Funnel", children=[dcc.Graph(figure=fig9)]),
-        dcc.Tab(label="First Response vs CSAT", children=[dcc.Graph(figure=fig10)]),
-    ])
+    dcc.Store(id="fig-url", data=app.get_relative_path(f"/fig/{DATA_VERSION}/")),
+    dcc.Tabs(id="tabs", value="priority", persistence=True, children=[
+        dcc.Tab(label=label, value=name) for name, label in TAB_LABELS.items()
+    ]),
+    dcc.Graph(id="tab-graph", figure={}),
 ])
 
+app.clientside_callback(
+    """
+    function(tab, figUrl) {
+        return fetch(figUrl + tab).then(function(r) { return r.json(); });
+    }
+    """,
+    Output("tab-graph", "figure"),
+    Input("tabs", "value"),
+    State("fig-url", "data"),
+)
+
 if __name__ == "__main__":
     app.run_server(host="0.0.0.0", port=8050, debug=True)
@@ -11,9 +11,14 @@ Outputs JSON and/or Markdown with:
 Usage:
   python scan_dist.py --dist ent_pycore --md out.md --json out.json
   python scan_dist.py --dist ent_pycore --ast  # AST mode (no imports)
+  python scan_dist.py --dist ent_pycore --ast --skip-dirs __pycache__  # also scan tests/vendor
+
+JSON is written with orjson when it is installed (pip install orjson),
+falling back to the stdlib json module otherwise.
 """
 
-import argparse, os, sys, json, pkgutil, inspect, ast
+import argparse, os, sys, json, pkgutil, inspect, ast, types
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, asdict
 from typing import List, Dict, Optional, Iterable, Tuple
 
@@ -23,10 +28,15 @@ except Exception:
     print("Requires Python 3.8+ (importlib.metadata).", file=sys.stderr)
     sys.exit(1)
 
+try:
+    import orjson  # optional: much faster JSON output, serializes dataclasses natively
+except ImportError:
+    orjson = None
+
 @dataclass
 class Item:
     name: str
-    kind: str   # "function" | "class"
+    kind: str   # "function" | "class" | "method" (AST mode with --methods)
     signature: str
     doc_head: str
     defined_in: Optional[str] = None
@@ -73,6 +83,10 @@ def find_import_roots(dist_name: str) -> Tuple[md.Distribution, List[str]]:
         roots = guess_top_level_from_files(dist)
     return dist, sorted(set(roots))
 
+# AST mode: directories never descended into, and generated files never parsed
+DEFAULT_SKIP_DIRS = frozenset({"__pycache__", "tests", "test", "vendor"})
+SKIP_FILE_SUFFIXES = ("_pb2.py", "_pb2_grpc.py")
+
 def should_keep(name: str, include_private: bool) -> bool:
     return include_private or not name.startswith("_")
 
@@ -82,15 +96,38 @@ def first_docline(s: Optional[str]) -> str:
     lines = s.strip().splitlines()
     return " ".join(lines[:2]).strip()
 
+def class_lines(srcfile: str) -> Dict[str, int]:
+    # qualname -> first line (decorators included, as inspect reports it) for every class in the file
+    with open(srcfile, "rb") as fh:
+        tree = ast.parse(fh.read(), filename=srcfile)
+    lines: Dict[str, int] = {}
+    stack = [(tree, "")]
+    while stack:
+        node, prefix = stack.pop()
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                qual = prefix + child.name
+                first = child.decorator_list[0] if child.decorator_list else child
+                lines.setdefault(qual, first.lineno)
+                stack.append((child, qual + "."))
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                stack.append((child, prefix + child.name + ".<locals>."))
+            else:
+                stack.append((child, prefix))
+    return lines
+
 def inspect_module(module, include_private: bool) -> List[Item]:
     out: List[Item] = []
-    for n, obj in inspect.getmembers(module):
+    # one parse per source file, shared by all classes defined in it
+    src_by_file: Dict[str, Optional[Dict[str, int]]] = {}
+    # vars() avoids getmembers' getattr-per-name and sort; names are filtered before any type test
+    for n, obj in list(vars(module).items()):
         if not should_keep(n, include_private):
             continue
         kind = None
-        if inspect.isfunction(obj) or inspect.isbuiltin(obj):
+        if isinstance(obj, (types.FunctionType, types.BuiltinFunctionType)):
             kind = "function"
-        elif inspect.isclass(obj):
+        elif isinstance(obj, type):
             kind = "class"
         if not kind:
             continue
@@ -103,10 +140,19 @@ def inspect_module(module, include_private: bool) -> List[Item]:
                 srcfile = inspect.getsourcefile(obj) or inspect.getfile(obj)
             except Exception:
                 srcfile = None
-            try:
-                _, lineno = inspect.getsourcelines(obj)
-            except Exception:
-                lineno = None
+            lineno = None
+            code = getattr(inspect.unwrap(obj), "__code__", None)
+            if code is not None:
+                lineno = code.co_firstlineno
+            elif kind == "class" and srcfile:
+                if srcfile not in src_by_file:
+                    try:
+                        src_by_file[srcfile] = class_lines(srcfile)
+                    except Exception:
+                        src_by_file[srcfile] = None
+                lines = src_by_file[srcfile]
+                if lines:
+                    lineno = lines.get(getattr(obj, "__qualname__", n))
             out.append(Item(
                 name=n, kind=kind, signature=sig,
                 doc_head=first_docline(inspect.getdoc(obj)),
@@ -143,36 +189,57 @@ def walk_import(pkg_name: str, include_private: bool) -> List[ModuleReport]:
     return reports
 
 # -------- AST mode (no imports) --------
-class AstVisitor(ast.NodeVisitor):
-    def __init__(self, include_private: bool):
-        self.include_private = include_private
-        self.items: List[Item] = []
-
-    def visit_FunctionDef(self, node: ast.FunctionDef):
-        if should_keep(node.name, self.include_private):
-            params = []
-            a = node.args
-            for p in a.args: params.append(p.arg)
-            if a.vararg: params.append("*" + a.vararg.arg)
-            for p in a.kwonlyargs: params.append(p.arg)
-            if a.kwarg: params.append("**" + a.kwarg.arg)
-            sig = "(" + ", ".join(params) + ")"
-            doc = ast.get_docstring(node) or ""
-            self.items.append(Item(
-                name=node.name, kind="function", signature=sig,
-                doc_head=first_docline(doc), line_no=getattr(node, "lineno", None)
-            ))
-        self.generic_visit(node)
+_AST_FUNCS = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+def ast_function_item(node, name: str, kind: str) -> Item:
+    a = node.args
+    sig = "(" + ", ".join([
+        *(p.arg for p in a.posonlyargs),
+        *(["/"] if a.posonlyargs else []),
+        *(p.arg for p in a.args),
+        *([f"*{a.vararg.arg}"] if a.vararg else []),
+        *(p.arg for p in a.kwonlyargs),
+        *([f"**{a.kwarg.arg}"] if a.kwarg else []),
+    ]) + ")"
+    return Item(
+        name=name, kind=kind, signature=sig,
+        doc_head=first_docline(ast.get_docstring(node)), line_no=node.lineno
+    )
+
+_AST_BLOCKS = (ast.If, ast.Try, ast.With, ast.AsyncWith) + ((ast.TryStar,) if hasattr(ast, "TryStar") else ())
+
+def module_level_defs(body: List[ast.stmt]) -> Iterable[ast.stmt]:
+    # Module-level statements, including those under top-level if/try/with blocks
+    # (version checks, ImportError fallbacks); never descends into function or class bodies.
+    for node in body:
+        if isinstance(node, _AST_BLOCKS):
+            for field in ("body", "orelse", "finalbody"):
+                yield from module_level_defs(getattr(node, field, None) or [])
+            for handler in getattr(node, "handlers", None) or []:
+                yield from module_level_defs(handler.body)
+        else:
+            yield node
 
-    def visit_ClassDef(self, node: ast.ClassDef):
-        if should_keep(node.name, self.include_private):
-            doc = ast.get_docstring(node) or ""
-            self.items.append(Item(
+def ast_items(tree: ast.Module, include_private: bool, methods: bool) -> List[Item]:
+    # Only module-level definitions (and, with methods, one level into classes) are visited.
+    items: List[Item] = []
+    for node in module_level_defs(tree.body):
+        if isinstance(node, _AST_FUNCS):
+            if should_keep(node.name, include_private):
+                items.append(ast_function_item(node, node.name, "function"))
+        elif isinstance(node, ast.ClassDef):
+            if not should_keep(node.name, include_private):
+                continue
+            items.append(Item(
                 name=node.name, kind="class",
                 signature="(inspect via import for full signature)",
-                doc_head=first_docline(doc), line_no=getattr(node, "lineno", None)
+                doc_head=first_docline(ast.get_docstring(node)), line_no=node.lineno
             ))
-        self.generic_visit(node)
+            if methods:
+                for sub in node.body:
+                    if isinstance(sub, _AST_FUNCS) and should_keep(sub.name, include_private):
+                        items.append(ast_function_item(sub, f"{node.name}.{sub.name}", "method"))
+    return items
 
 def package_dir(pkg_name: str) -> Optional[str]:
     try:
@@ -188,76 +255,73 @@ def package_dir(pkg_name: str) -> Optional[str]:
     except Exception:
         return None
 
-def walk_ast(pkg_name: str) -> List[ModuleReport]:
+def parse_one(modname: str, path: str, include_private: bool, methods: bool) -> ModuleReport:
+    try:
+        # bytes in: ast.parse honours the file's own encoding cookie
+        with open(path, "rb") as fh:
+            src = fh.read()
+        tree = ast.parse(src, filename=path)
+        items = ast_items(tree, include_private, methods)
+        for it in items: it.defined_in = path
+        return ModuleReport(module=modname, items=items)
+    except Exception as e:
+        return ModuleReport(module=modname, error=repr(e), items=[])
+
+def walk_ast(pkg_name: str, include_private: bool,
+             skip_dirs: frozenset = DEFAULT_SKIP_DIRS, methods: bool = False) -> List[ModuleReport]:
     base = package_dir(pkg_name)
     if base is None:
         # Could be a single-file module or a pure namespace package
         # Try to locate as a single .py in sys.path
-        reports: List[ModuleReport] = []
         for p in sys.path:
             candidate = os.path.join(p, pkg_name + ".py")
             if os.path.isfile(candidate):
-                try:
-                    with open(candidate, "r", encoding="utf-8") as fh:
-                        src = fh.read()
-                    tree = ast.parse(src, filename=candidate)
-                    v = AstVisitor(args.include_private)
-                    v.visit(tree)
-                    for it in v.items: it.defined_in = candidate
-                    reports.append(ModuleReport(module=pkg_name, items=v.items))
-                except Exception as e:
-                    reports.append(ModuleReport(module=pkg_name, error=repr(e), items=[]))
-                return reports
+                return [parse_one(pkg_name, candidate, include_private, methods)]
         return [ModuleReport(module=pkg_name, error="Could not locate package directory", items=[])]
-    reports: List[ModuleReport] = []
+    jobs: List[Tuple[str, str]] = []
     for root, dirs, files in os.walk(base):
-        dirs[:] = [d for d in dirs if not d.startswith(".") and d != "__pycache__"]
+        dirs[:] = [d for d in dirs if d not in skip_dirs and not d.startswith(".")]
         for f in files:
-            if not f.endswith(".py"): continue
+            if not f.endswith(".py") or f.endswith(SKIP_FILE_SUFFIXES): continue
             full = os.path.join(root, f)
             rel = os.path.relpath(full, base)
             parts = [pkg_name] + rel[:-3].split(os.sep)
             if parts[-1] == "__init__": parts.pop()
-            modname = ".".join(parts)
-            try:
-                with open(full, "r", encoding="utf-8") as fh:
-                    src = fh.read()
-                tree = ast.parse(src, filename=full)
-                v = AstVisitor(args.include_private)
-                v.visit(tree)
-                for it in v.items: it.defined_in = full
-                reports.append(ModuleReport(module=modname, items=v.items))
-            except Exception as e:
-                reports.append(ModuleReport(module=modname, error=repr(e), items=[]))
-    return reports
+            jobs.append((".".join(parts), full))
+    # file reads release the GIL, so threads overlap the I/O of many small files
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(lambda job: parse_one(job[0], job[1], include_private, methods), jobs))
 
-def to_markdown(meta: Dict[str, str], reports: List[ModuleReport]) -> str:
-    parts = []
-    parts.append(f"# Distribution Catalog: `{meta.get('name','?')}`")
-    parts.append("")
-    parts.append(f"- **Version**: {meta.get('version','?')}  ")
-    parts.append(f"- **Location**: {meta.get('location','?')}")
-    parts.append("\n---\n")
+_MD_ESCAPE = str.maketrans({"|": "\\|"})
+
+def to_markdown(meta: Dict[str, str], reports: List[ModuleReport], fh) -> None:
+    # written line by line to fh; no intermediate list or joined string
+    w = fh.write
+    w(f"# Distribution Catalog: `{meta.get('name','?')}`\n")
+    w("\n")
+    w(f"- **Version**: {meta.get('version','?')}  \n")
+    w(f"- **Location**: {meta.get('location','?')}\n")
+    w("\n---\n\n")
     for rep in sorted(reports, key=lambda r: r.module):
-        parts.append(f"## Module: `{rep.module}`")
+        w(f"## Module: `{rep.module}`\n")
         if rep.error:
-            parts.append(f"> ❗ Error: `{rep.error}`\n")
+            w(f"> ❗ Error: `{rep.error}`\n\n")
             continue
         if not rep.items:
-            parts.append("_No public functions/classes found._\n")
+            w("_No public functions/classes found._\n\n")
             continue
-        parts.append("| Name | Kind | Signature | Doc (first line) | File | Line |")
-        parts.append("|------|------|-----------|------------------|------|------|")
+        w("| Name | Kind | Signature | Doc (first line) | File | Line |\n")
+        w("|------|------|-----------|------------------|------|------|\n")
         for it in rep.items:
-            sig = it.signature.replace("|", "\\|")
-            doc = (it.doc_head or "").replace("|", "\\|")
-            file_disp = (it.defined_in or "").replace("|", "\\|")
             line_disp = it.line_no if it.line_no is not None else ""
-            parts.append(f"| `{it.name}` | {it.kind} | `{sig}` | {doc} | {file_disp} | {line_disp} |")
-        parts.append("")
-    return "\n".join(parts)
+            w(f"| `{it.name}` | {it.kind} | `{it.signature.translate(_MD_ESCAPE)}` | "
+              f"{(it.doc_head or '').translate(_MD_ESCAPE)} | "
+              f"{(it.defined_in or '').translate(_MD_ESCAPE)} | {line_disp} |\n")
+        w("\n")
 
-def scan_distribution(dist_name: str, ast_mode: bool, include_private: bool):
+def scan_distribution(dist_name: str, ast_mode: bool, include_private: bool,
+                      skip_dirs: frozenset = DEFAULT_SKIP_DIRS, methods: bool = False):
     dist, roots = find_import_roots(dist_name)
     meta = {
         "name": dist.metadata.get("Name", dist_name),
@@ -288,31 +352,39 @@ def scan_distribution(dist_name: str, ast_mode: bool, include_private: bool):
 
     # Scan each discovered import root
     for root in roots:
-        reports = walk_ast(root) if ast_mode else walk_import(root, include_private)
+        reports = walk_ast(root, include_private, skip_dirs, methods) if ast_mode else walk_import(root, include_private)
         all_reports.extend(reports)
 
     return meta, all_reports
 
+def dump_json(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, default=asdict).encode("utf-8")
+
 def main(args):
-    meta, reports = scan_distribution(args.dist, args.ast, args.include_private)
+    skip_dirs = frozenset(d.strip() for d in args.skip_dirs.split(",") if d.strip())
+    meta, reports = scan_distribution(args.dist, args.ast, args.include_private, skip_dirs, args.methods)
 
-    out_json = {"meta": meta, "reports": [asdict(r) for r in reports]}
-    json_text = json.dumps(out_json, indent=2)
+    payload = dump_json({"meta": meta, "reports": reports})
     if not args.quiet:
-        print(json_text)
+        sys.stdout.flush()
+        sys.stdout.buffer.write(payload + b"\n")
 
     if args.md:
-        md_text = to_markdown(meta, reports)
-        with open(args.md, "w", encoding="utf-8") as f:
-            f.write(md_text)
+        with open(args.md, "w", encoding="utf-8", buffering=1 << 16) as f:
+            to_markdown(meta, reports, f)
     if args.json:
-        with open(args.json, "w", encoding="utf-8") as f:
-            f.write(json_text)
+        with open(args.json, "wb") as f:
+            f.write(payload)
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser(description="Scan a Python distribution (pip name) and catalog its importable modules.")
     p.add_argument("--dist", required=True, help="Distribution name (pip install name), e.g. ent_pycore")
     p.add_argument("--ast", action="store_true", help="Use AST mode (no imports, safer for heavy side-effects)")
+    p.add_argument("--skip-dirs", default=",".join(sorted(DEFAULT_SKIP_DIRS)),
+                   help="Comma-separated directory names to prune in AST mode (default: %(default)s)")
+    p.add_argument("--methods", action="store_true", help="AST mode: also list public methods of top-level classes")
     p.add_argument("--include-private", action="store_true", help="Include _private names")
     p.add_argument("--json", help="Write JSON here")
     p.add_argument("--md", help="Write Markdown here")